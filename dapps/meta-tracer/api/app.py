@@ -1,11 +1,19 @@
-import os, json, time, hashlib, binascii, pathlib
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, Request
+import os, json, time, uuid, heapq, asyncio, hashlib, logging, pathlib, sqlite3
+from contextlib import asynccontextmanager
+from typing import Annotated, Optional, List
+import aiofiles
+import aiohttp
+import msgspec
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel, Field
-from web3 import Web3
+from eth_abi import decode as abi_decode
+from eth_hash.auto import keccak
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from web3 import AsyncWeb3, AsyncHTTPProvider, Web3
+from web3.exceptions import ContractLogicError, TimeExhausted, TransactionNotFound
 from solcx import compile_source, install_solc, set_solc_version
 
 # ───────────────────── 설정 ─────────────────────
@@ -16,17 +24,19 @@ PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "")
 DATA_DIR        = pathlib.Path("/data")
 CONTRACT_FILE   = DATA_DIR / "contract.json"  # { address, abi }
 OBJECTS_DIR     = DATA_DIR / "objects"        # 로컬 JSON 저장(데모)
+UPLOAD_DIR      = DATA_DIR / "uploads"        # raw 업로드 임시 파일 (objects와 같은 볼륨 → os.replace)
+INDEX_DB        = DATA_DIR / "index.db"       # 이벤트 인덱스(SQLite) — metadata 테이블 + 스캔 위치
+LOG_WINDOW      = 50_000                      # 인덱스 커밋 단위 블록 범위
+LOG_STEP_MAX    = 5000                        # get_logs 1회 조회 최대 블록 범위(실패 시 자동 축소)
+
+log = logging.getLogger("uvicorn.error")
 
 if not PRIVATE_KEY:
     raise RuntimeError("PRIVATE_KEY is required (demo only). Use a test key.")
 
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
+w3 = AsyncWeb3(AsyncHTTPProvider(RPC_URL))
 acct = w3.eth.account.from_key(bytes.fromhex(PRIVATE_KEY[2:] if PRIVATE_KEY.startswith("0x") else PRIVATE_KEY))
 
-app = FastAPI(title="Metadata dApp (Quorum, FastAPI)")
-app.mount("/objects", StaticFiles(directory=str(OBJECTS_DIR), html=False), name="objects")
-templates = Jinja2Templates(directory="templates")
-
 # ───────────────────── 도우미 ─────────────────────
 SOLC_VER = "0.8.20"
 CONTRACT_SRC = (pathlib.Path("contracts")/"MetadataRegistry.sol").read_text()
@@ -46,7 +56,116 @@ def _compile_contract():
     return artifact["abi"], artifact["bin"]
 
 
-def _load_or_deploy_contract():
+_POLL_DELAYS = (0.2, 0.2, 0.5, 0.5, 1.0)  # receipt 폴링 간격(초) — 이후로는 마지막 값 유지
+
+
+def _poll_delay(i: int) -> float:
+    return _POLL_DELAYS[min(i, len(_POLL_DELAYS) - 1)]
+
+
+async def _wait_receipt(tx_hash, timeout: float = 30):
+    """점증 간격으로 receipt 폴링. 개별 조회는 5초, 전체는 timeout초로 제한."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    i = 0
+    while loop.time() < deadline:
+        await asyncio.sleep(_poll_delay(i))
+        i += 1
+        try:
+            return await asyncio.wait_for(w3.eth.get_transaction_receipt(tx_hash), 5)
+        except (TransactionNotFound, asyncio.TimeoutError):
+            pass
+    raise TimeExhausted(f"Transaction {Web3.to_hex(tx_hash)} is not in the chain after {timeout} seconds")
+
+
+_nonce_lock = asyncio.Lock()
+_next_nonce: Optional[int] = None  # 로컬 nonce 카운터(None이면 다음 예약 시 노드에서 읽음)
+_free_nonces: List[int] = []       # 예약 후 전송하지 못해 반납된 nonce (min-heap, 먼저 재사용)
+_inflight_nonces = set()           # 예약했지만 아직 전송 결과가 나지 않은 nonce
+
+
+async def _reserve_nonce() -> int:
+    global _next_nonce
+    async with _nonce_lock:
+        if _free_nonces:
+            n = heapq.heappop(_free_nonces)
+        else:
+            if _next_nonce is None:
+                _next_nonce = await w3.eth.get_transaction_count(acct.address, "pending")
+            n = _next_nonce
+            _next_nonce += 1
+        _inflight_nonces.add(n)
+        return n
+
+
+def _settle_nonce(n: int):
+    # 전송 성공 — 더 이상 반납될 일 없음
+    _inflight_nonces.discard(n)
+
+
+def _release_nonce(n: int):
+    """전송하지 못한 nonce 반납. 다른 요청이 예약해 둔 nonce는 건드리지 않는다."""
+    global _next_nonce
+    _inflight_nonces.discard(n)
+    if n == _next_nonce - 1:
+        _next_nonce -= 1
+        # 카운터 바로 아래까지 이어진 반납분도 함께 회수
+        while _free_nonces and max(_free_nonces) == _next_nonce - 1:
+            _free_nonces.remove(_next_nonce - 1)
+            heapq.heapify(_free_nonces)
+            _next_nonce -= 1
+    else:
+        heapq.heappush(_free_nonces, n)
+    # 진행 중인 예약이 없을 때만 노드 기준으로 다시 읽도록 초기화
+    if not _inflight_nonces:
+        _next_nonce = None
+        _free_nonces.clear()
+
+
+_chain_id: Optional[int] = None
+
+
+async def _get_chain_id() -> int:
+    # chainId를 직접 채워 build_transaction이 tx마다 eth_chainId를 호출하지 않도록
+    global _chain_id
+    if _chain_id is None:
+        _chain_id = await w3.eth.chain_id
+    return _chain_id
+
+
+async def _sign_tx(call, gas: Optional[int] = 3_000_000):
+    """nonce 예약 → tx 빌드 → 서명. (signed, nonce) 반환, 실패 시 nonce 반납.
+    gas=None이면 build_transaction이 eth_estimateGas로 채운다."""
+    chain_id = await _get_chain_id()
+    nonce = await _reserve_nonce()
+    params = {"from": acct.address, "nonce": nonce, "gasPrice": 0, "chainId": chain_id}
+    if gas is not None:
+        params["gas"] = gas
+    try:
+        tx = await call.build_transaction(params)
+        # 이미 파싱된 키를 가진 LocalAccount로 바로 서명 (요청마다 키 재파싱 생략)
+        return acct.sign_transaction(tx), nonce
+    except BaseException:
+        _release_nonce(nonce)
+        raise
+
+
+async def _send_tx(signed, nonce: int):
+    """서명된 tx 전송 → receipt 대기. 전송 실패 시 nonce 반납."""
+    try:
+        tx_hash = await w3.eth.send_raw_transaction(signed.rawTransaction)
+    except BaseException:
+        _release_nonce(nonce)
+        raise
+    _settle_nonce(nonce)
+    return await _wait_receipt(tx_hash)
+
+
+async def _transact(call, gas: Optional[int] = 3_000_000):
+    return await _send_tx(*await _sign_tx(call, gas))
+
+
+async def _load_or_deploy_contract():
     # 1) 캐시 파일 있으면 사용
     if CONTRACT_FILE.exists():
         data = json.loads(CONTRACT_FILE.read_text())
@@ -54,16 +173,9 @@ def _load_or_deploy_contract():
 
     # 2) AUTO_DEPLOY면 배포
     if AUTO_DEPLOY:
-        abi, bytecode = _compile_contract()
+        abi, bytecode = await asyncio.to_thread(_compile_contract)
         ct = w3.eth.contract(abi=abi, bytecode=bytecode)
-        tx = ct.constructor().build_transaction({
-            "from": acct.address,
-            "nonce": w3.eth.get_transaction_count(acct.address),
-            "gas": 6_000_000,
-            "gasPrice": 0
-        })
-        signed = w3.eth.account.sign_transaction(tx, acct.key)
-        rc = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed.rawTransaction))
+        rc = await _transact(ct.constructor(), gas=6_000_000)
         addr = rc.contractAddress
         CONTRACT_FILE.parent.mkdir(parents=True, exist_ok=True)
         CONTRACT_FILE.write_text(json.dumps({"address": addr, "abi": abi}, indent=2))
@@ -73,31 +185,300 @@ def _load_or_deploy_contract():
 
 
 def _b32(hexstr: str) -> bytes:
-    s = hexstr[2:] if hexstr.startswith("0x") else hexstr
-    raw = binascii.unhexlify(s)
-    if len(raw) != 32:
+    h = hexstr[2:] if hexstr.startswith(("0x", "0X")) else hexstr
+    # bytes.fromhex는 바이트 사이 공백을 허용하므로 길이로 먼저 걸러냄 (64 hex 정확히)
+    if len(h) != 64:
         raise ValueError("must be 32 bytes")
-    return raw
+    return bytes.fromhex(h)
+
+
+def _sha256(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+async def _write_object(target: pathlib.Path, text: str):
+    # 이벤트 루프를 막지 않도록 디렉터리 생성/쓰기를 스레드로 넘김
+    await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+    async with aiofiles.open(target, "w", encoding="utf-8") as f:
+        await f.write(text)
+
+
+# get(bytes32) 호출 데이터/반환 타입을 미리 계산 — ContractFunction 재생성 및 web3 포매터 생략
+_GET_PREFIX = "0x" + function_signature_to_4byte_selector("get(bytes32)").hex()
+_ITEM_TYPES = ("(bytes32,string,uint256,address,uint256,uint256,address)",)
+
+
+# get_one 응답 캐시 — 키는 인덱스와 같은 "0x..." recordId. update/MetadataUpdated 스캔 시 무효화
+_record_cache = TTLCache(maxsize=10_000, ttl=30)
+# recordId별 세대 — 무효화마다 증가. 조회 도중 세대가 바뀌었으면 그 결과는 캐시에 넣지 않음
+_record_gen = {}
+
+
+def _invalidate_record(key: str):
+    _record_gen[key] = _record_gen.get(key, 0) + 1
+    _record_cache.pop(key, None)
+
+
+async def _get_item(rid: bytes) -> tuple:
+    raw = await w3.eth.call({"to": CONTRACT_ADDR, "data": _GET_PREFIX + rid.hex()})
+    (it,) = abi_decode(_ITEM_TYPES, raw)
+    return it
+
+
+# 이벤트 topic0 / data 타입 — recordId(topic1)·owner|updatedBy(topic2)는 indexed
+_CREATED_TOPIC = "0x" + keccak(b"MetadataCreated(bytes32,bytes32,string,uint256,address,uint256)").hex()
+_UPDATED_TOPIC = "0x" + keccak(b"MetadataUpdated(bytes32,bytes32,string,uint256,address,uint256)").hex()
+_EVENT_DATA_TYPES = ("bytes32", "string", "uint256", "uint256")  # contentHash, uri, version, timestamp
+
+
+def _decode_logs(logs):
+    """raw 로그를 (recordId, contentHash, uri, version, actor, timestamp)로 직접 디코드."""
+    decode, checksum, types = abi_decode, to_checksum_address, _EVENT_DATA_TYPES
+    for lg in logs:
+        topics = lg["topics"]
+        ch, uri, ver, ts = decode(types, lg["data"])
+        yield bytes(topics[1]), ch, uri, ver, checksum(topics[2][12:]), ts
+
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS metadata (
+    record_id    BLOB PRIMARY KEY,
+    content_hash BLOB,
+    uri          TEXT,
+    version      INTEGER,
+    owner        TEXT,
+    created_at   INTEGER,
+    updated_at   INTEGER,
+    updated_by   TEXT
+);
+CREATE INDEX IF NOT EXISTS metadata_updated_at ON metadata (updated_at DESC);
+"""
+
+_UPSERT_CREATED = """
+INSERT INTO metadata VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (record_id) DO UPDATE SET
+    content_hash = excluded.content_hash, uri = excluded.uri, version = excluded.version,
+    owner = excluded.owner, created_at = excluded.created_at,
+    updated_at = excluded.updated_at, updated_by = excluded.updated_by
+"""
+
+_UPSERT_UPDATED = """
+INSERT INTO metadata (record_id, content_hash, uri, version, updated_at, updated_by) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (record_id) DO UPDATE SET
+    content_hash = excluded.content_hash, uri = excluded.uri, version = excluded.version,
+    updated_at = excluded.updated_at, updated_by = excluded.updated_by
+"""
 
+_SELECT_PAGE = """
+SELECT '0x' || lower(hex(record_id)), '0x' || lower(hex(content_hash)), uri, version,
+       owner, updated_by, updated_at, created_at
+FROM metadata ORDER BY updated_at DESC LIMIT ? OFFSET ?
+"""
+_PAGE_KEYS = ("recordId", "contentHash", "uri", "version", "owner", "updatedBy", "updatedAt", "createdAt")
 
-def _sha256_hex(data: bytes) -> str:
-    return hashlib.sha256(data).hexdigest()
+
+def _open_index(contract: str) -> sqlite3.Connection:
+    db = sqlite3.connect(str(INDEX_DB), check_same_thread=False, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_INDEX_SCHEMA)
+    # 컨트랙트가 바뀌었으면(재배포) 인덱스를 비우고 처음부터 스캔
+    row = db.execute("SELECT value FROM meta WHERE key = 'contract'").fetchone()
+    if row is None or row[0] != contract:
+        db.execute("BEGIN")
+        db.execute("DELETE FROM metadata")
+        db.execute("INSERT OR REPLACE INTO meta VALUES ('contract', ?), ('last_block', '0')", (contract,))
+        db.execute("COMMIT")
+    return db
+
+
+def _indexed_version(rid: bytes) -> int:
+    row = _DB.execute("SELECT version FROM metadata WHERE record_id = ?", (rid,)).fetchone()
+    return row[0] if row else 0
+
+
+_log_step = {_CREATED_TOPIC: LOG_STEP_MAX, _UPDATED_TOPIC: LOG_STEP_MAX}  # topic별 현재 조회 범위
+
+
+async def _scan(topic0: str, from_b: int, to_b: int) -> list:
+    """[from_b, to_b] 로그를 적응형 범위로 조회 — 시간 초과/결과 과다 시 범위 절반, 성공 시 두 배."""
+    logs = []
+    step = _log_step[topic0]
+    while from_b <= to_b:
+        to = min(from_b + step - 1, to_b)
+        try:
+            logs += await w3.eth.get_logs({"address": CONTRACT_ADDR, "topics": [topic0], "fromBlock": from_b, "toBlock": to})
+        except (asyncio.TimeoutError, ValueError):
+            if step == 1:
+                raise
+            step //= 2
+            continue
+        from_b = to + 1
+        step = min(step * 2, LOG_STEP_MAX)
+    _log_step[topic0] = step
+    return logs
+
+
+async def _sync_index():
+    """마지막 스캔 이후 블록(last_block+1 ~ head)의 이벤트만 읽어 metadata 테이블에 upsert."""
+    head = await w3.eth.block_number
+    start = int(_DB.execute("SELECT value FROM meta WHERE key = 'last_block'").fetchone()[0]) + 1
+    if start > head:
+        return
+    for lo in range(start, head + 1, LOG_WINDOW):
+        hi = min(lo + LOG_WINDOW - 1, head)
+        created, updated = await asyncio.gather(
+            _scan(_CREATED_TOPIC, lo, hi),
+            _scan(_UPDATED_TOPIC, lo, hi),
+        )
+        updated = list(_decode_logs(updated))
+        for ev in updated:
+            _invalidate_record("0x" + ev[0].hex())
+        # 구간 단위로 커밋 — 이벤트 반영과 last_block 갱신을 원자적으로
+        _DB.execute("BEGIN")
+        try:
+            _DB.executemany(_UPSERT_CREATED, (
+                (rid, ch, uri, ver, owner, ts, ts, owner)
+                for rid, ch, uri, ver, owner, ts in _decode_logs(created)
+            ))
+            _DB.executemany(_UPSERT_UPDATED, (
+                (rid, ch, uri, ver, ts, by)
+                for rid, ch, uri, ver, by, ts in updated
+            ))
+            _DB.execute("UPDATE meta SET value = ? WHERE key = 'last_block'", (str(hi),))
+            _DB.execute("COMMIT")
+        except Exception:
+            _DB.execute("ROLLBACK")
+            raise
 
 
 # ───────────────────── 모델 ─────────────────────
-class CreateReq(BaseModel):
-    recordIdHex: Optional[str] = Field(None, description="0x + 64 hex (bytes32). 없으면 서버가 생성")
-    json_text: Optional[str] = Field(None, description="저장할 JSON 문자열. 제공 시 contentHash는 서버가 계산하며, /objects에 저장")
-    uri: Optional[str] = Field(None, description="외부 URI 직접 지정 시")
+class CreateReq(msgspec.Struct, omit_defaults=True):
+    recordIdHex: Annotated[Optional[str], msgspec.Meta(description="0x + 64 hex (bytes32). 없으면 서버가 생성")] = None
+    json_text: Annotated[Optional[str], msgspec.Meta(description="저장할 JSON 문자열. 제공 시 contentHash는 서버가 계산하며, /objects에 저장")] = None
+    uri: Annotated[Optional[str], msgspec.Meta(description="외부 URI 직접 지정 시")] = None
 
-class UpdateReq(BaseModel):
+class UpdateReq(msgspec.Struct, omit_defaults=True):
     json_text: Optional[str] = None
     uri: Optional[str] = None
 
+
+def _body_parser(tp):
+    # 요청 본문을 msgspec으로 바로 디코드하는 FastAPI 의존성 (Decoder는 타입별로 1회 생성)
+    decoder = msgspec.json.Decoder(tp)
+
+    async def parse(req: Request):
+        try:
+            return decoder.decode(await req.body())
+        except msgspec.DecodeError as e:
+            raise HTTPException(422, f"invalid body: {e}")
+    return parse
+
+parse_create = _body_parser(CreateReq)
+parse_create_batch = _body_parser(List[CreateReq])
+parse_update = _body_parser(UpdateReq)
+
+
+def _body_schema(tp) -> dict:
+    # Depends로 본문을 파싱하면 FastAPI가 requestBody 스키마를 만들지 않으므로 msgspec 스키마를 직접 노출
+    # ($defs 참조는 OpenAPI 문서 루트에서 풀리지 않으므로 인라인으로 펼침)
+    (schema,), defs = msgspec.json.schema_components([tp])
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(defs[node["$ref"].rsplit("/", 1)[-1]])
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": inline(schema)}}}}
+
+CREATE_BODY = _body_schema(CreateReq)
+CREATE_BATCH_BODY = _body_schema(List[CreateReq])
+UPDATE_BODY = _body_schema(UpdateReq)
+
+
+def parse_rid(recordIdHex: str) -> bytes:
+    # 경로 파라미터 recordId를 라우팅 단계에서 한 번만 검증/변환
+    try:
+        return _b32(recordIdHex)
+    except ValueError as e:
+        raise HTTPException(400, f"invalid recordId: {e}")
+
+RecordId = Annotated[bytes, Depends(parse_rid)]
+
 # ───────────────────── 시작 시 컨트랙트 준비 ─────────────────────
-CONTRACT_ADDR, CONTRACT_ABI = _load_or_deploy_contract()
-CT = w3.eth.contract(address=CONTRACT_ADDR, abi=CONTRACT_ABI)
+CONTRACT_ADDR = CONTRACT_ABI = CT = _DB = None
+_CREATE_FN = _UPDATE_FN = _CREATE_BATCH_FN = None
+_index_lock = asyncio.Lock()
+
+
+async def _prepare_contract(app: FastAPI):
+    global CONTRACT_ADDR, CONTRACT_ABI, CT, _DB, _CREATE_FN, _UPDATE_FN, _CREATE_BATCH_FN
+    CONTRACT_ADDR, CONTRACT_ABI = await _load_or_deploy_contract()
+    CT = w3.eth.contract(address=CONTRACT_ADDR, abi=CONTRACT_ABI)
+    _CREATE_FN = CT.get_function_by_signature("create(bytes32,bytes32,string)")
+    _UPDATE_FN = CT.get_function_by_signature("update(bytes32,bytes32,string)")
+    # 이전에 배포된(contract.json 캐시) 컨트랙트에는 createBatch가 없을 수 있음
+    if any(f.get("name") == "createBatch" for f in CONTRACT_ABI):
+        _CREATE_BATCH_FN = CT.get_function_by_signature("createBatch(bytes32[],bytes32[],string[])")
+    _DB = _open_index(CONTRACT_ADDR)
+    app.state.ct_ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # keep-alive 커넥션 풀을 공유하는 단일 세션 — 요청마다 TCP 핸드셰이크 방지
+    session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=64, limit_per_host=32, keepalive_timeout=60))
+    await w3.provider.cache_async_session(session)
+    # 컨트랙트 로드/배포는 백그라운드로 — 준비 전에도 /api/health 등은 바로 응답
+    app.state.ct_ready = False
+    app.state.ct_task = asyncio.create_task(_prepare_contract(app))
+    app.state.ct_task.add_done_callback(_log_prepare_result)
+    yield
+    app.state.ct_task.cancel()
+    await session.close()
+
+
+class ObjectFiles(StaticFiles):
+    # 객체 경로는 재시도/경합 시 다시 쓰일 수 있음 — nginx와 같은 짧은 캐시만 허용
+    def file_response(self, *args, **kwargs):
+        resp = super().file_response(*args, **kwargs)
+        resp.headers["Cache-Control"] = "public, max-age=60"
+        return resp
+
+
+def _log_prepare_result(task: asyncio.Task):
+    if task.cancelled():
+        return
+    e = task.exception()  # 여기서 꺼내야 "Task exception was never retrieved"도 남지 않음
+    if e is not None:
+        log.error("contract preparation failed", exc_info=e)
+    else:
+        log.info("contract ready at %s", CONTRACT_ADDR)
+
+
+def _contract_error(app: FastAPI) -> Optional[BaseException]:
+    task = app.state.ct_task
+    if task.done() and not task.cancelled():
+        return task.exception()
+    return None
+
+
+def _require_contract(req: Request):
+    if req.app.state.ct_ready:
+        return
+    err = _contract_error(req.app)
+    if err is not None:
+        raise HTTPException(503, f"contract unavailable: {err}")
+    raise HTTPException(503, "contract not ready")
+
+
 OBJECTS_DIR.mkdir(parents=True, exist_ok=True)
+app = FastAPI(title="Metadata dApp (Quorum, FastAPI)", lifespan=lifespan, default_response_class=ORJSONResponse)
+app.mount("/objects", ObjectFiles(directory=str(OBJECTS_DIR), html=False), name="objects")
+templates = Jinja2Templates(directory="templates")
 
 # ───────────────────── UI ─────────────────────
 @app.get("/", response_class=HTMLResponse)
@@ -106,122 +487,196 @@ async def index(req: Request):
 
 # ───────────────────── API ─────────────────────
 @app.get("/api/health")
-def health():
-    return {
-        "chainId": w3.eth.chain_id,
-        "gasPrice": w3.eth.gas_price,
+async def health(req: Request):
+    chain_id, gas_price = await asyncio.gather(w3.eth.chain_id, w3.eth.gas_price)
+    err = _contract_error(req.app)
+    body = {
+        "chainId": chain_id,
+        "gasPrice": gas_price,
         "contract": CONTRACT_ADDR,
         "account": acct.address,
+        "ready": req.app.state.ct_ready,
+        "error": str(err) if err is not None else None,
     }
+    # 컨트랙트 준비가 실패했으면 프로브가 알 수 있도록 503 (준비 중이면 200 + ready=false)
+    return ORJSONResponse(body, status_code=503 if err is not None else 200)
 
 @app.get("/api/address")
-def addr():
+async def addr():
     return {"contract": CONTRACT_ADDR}
 
-@app.get("/api/metadata")
-def list_metadata():
-    # 이벤트 기반 간단 나열 (개발/소규모 용)
-    created = CT.events.MetadataCreated.create_filter(fromBlock=0)
-    updated = CT.events.MetadataUpdated.create_filter(fromBlock=0)
-    items = {}
-    for lg in created.get_all_entries():
-        a = lg["args"]
-        rid = a["recordId"].hex()
-        items[rid] = {
-            "recordId": rid,
-            "contentHash": a["contentHash"].hex(),
-            "uri": a["uri"],
-            "version": int(a["version"]),
-            "owner": a["owner"],
-            "updatedBy": a["owner"],
-            "updatedAt": int(a["timestamp"]),
-            "createdAt": int(a["timestamp"]),
+@app.get("/api/metadata", dependencies=[Depends(_require_contract)])
+async def list_metadata(limit: Optional[int] = Query(None, ge=1), offset: int = Query(0, ge=0)):
+    # 이벤트 기반 나열 — 새 블록 구간만 증분 스캔 후 SQLite 인덱스에서 최신순 조회
+    async with _index_lock:
+        await _sync_index()
+    rows = _DB.execute(_SELECT_PAGE, (-1 if limit is None else limit, offset)).fetchall()
+    # 항목이 많으므로 jsonable_encoder를 거치지 않고 바로 orjson 직렬화
+    return ORJSONResponse({"items": [dict(zip(_PAGE_KEYS, r)) for r in rows]})
+
+@app.get("/api/metadata/{recordIdHex}", dependencies=[Depends(_require_contract)])
+async def get_one(recordIdHex: str, rid: RecordId):
+    key = "0x" + rid.hex()
+    hit = _record_cache.get(key)
+    # 인덱스가 더 높은 버전을 알고 있으면 캐시를 버리고 다시 조회
+    if hit is None or hit["version"] < _indexed_version(rid):
+        gen = _record_gen.get(key, 0)
+        it = await _get_item(rid)
+        if it[3] == "0x0000000000000000000000000000000000000000":
+            raise HTTPException(404, "not found")
+        hit = {
+            "contentHash": "0x" + it[0].hex(),
+            "uri": it[1],
+            "version": int(it[2]),
+            "owner": to_checksum_address(it[3]),
+            "createdAt": int(it[4]),
+            "updatedAt": int(it[5]),
+            "updatedBy": to_checksum_address(it[6]),
         }
-    for lg in updated.get_all_entries():
-        a = lg["args"]
-        rid = a["recordId"].hex()
-        if rid not in items:
-            items[rid] = {}
-        items[rid].update({
-            "recordId": rid,
-            "contentHash": a["contentHash"].hex(),
-            "uri": a["uri"],
-            "version": int(a["version"]),
-            "updatedBy": a["updatedBy"],
-            "updatedAt": int(a["timestamp"]),
-        })
-    # 최신순 정렬
-    return {"items": sorted(items.values(), key=lambda x: x.get("updatedAt", 0), reverse=True)}
-
-@app.get("/api/metadata/{recordIdHex}")
-def get_one(recordIdHex: str):
-    try:
-        rid = _b32(recordIdHex)
-    except Exception as e:
-        raise HTTPException(400, f"invalid recordId: {e}")
-    it = CT.functions.get(rid).call()
-    if it[3] == "0x0000000000000000000000000000000000000000":
-        raise HTTPException(404, "not found")
-    return {
-        "recordId": recordIdHex.lower(),
-        "contentHash": Web3.to_hex(it[0]),
-        "uri": it[1],
-        "version": int(it[2]),
-        "owner": it[3],
-        "createdAt": int(it[4]),
-        "updatedAt": int(it[5]),
-        "updatedBy": it[6],
-    }
+        # 조회 중 update/스캔이 무효화했다면 옛 값일 수 있으므로 캐시하지 않음
+        if _record_gen.get(key, 0) == gen:
+            _record_cache[key] = hit
+    return {"recordId": key, **hit}
 
-@app.post("/api/metadata")
-def create(req: CreateReq):
+def _resolve_rid(req: CreateReq, salt: str = "") -> bytes:
     # recordId 생성
     if req.recordIdHex:
         try:
-            rid = _b32(req.recordIdHex)
-        except Exception as e:
+            return _b32(req.recordIdHex)
+        except ValueError as e:
             raise HTTPException(400, f"invalid recordId: {e}")
-    else:
-        # 내용 기반 + 시간 salt
-        seed = (req.json_text or str(time.time())).encode()
-        rid = Web3.keccak(seed)
+    # 내용 기반 + 시간 salt (배치에서는 항목 순번을 덧붙여 충돌 방지)
+    seed = (req.json_text or str(time.time()) + salt).encode()
+    return keccak(seed)
 
-    # contentHash & uri 결정
+def _plan_v1(rid: bytes, req: CreateReq):
+    """contentHash & uri 결정. json_text면 저장 경로(/objects/<rid>/v1.json)도 함께 반환."""
     if req.json_text:
         raw = req.json_text.encode()
-        ch_hex = _sha256_hex(raw)
+        ch = _sha256(raw)
         # 로컬 저장(데모): /objects/<rid>/v1.json
-        rid_hex = Web3.to_hex(rid)[2:]
+        rid_hex = rid.hex()
         target = OBJECTS_DIR / rid_hex / "v1.json"
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(req.json_text)
         uri = f"{PUBLIC_BASE_URL}/objects/{rid_hex}/v1.json" if PUBLIC_BASE_URL else f"/objects/{rid_hex}/v1.json"
+        return ch, uri, target
     elif req.uri:
-        ch_hex = "0" * 64  # 알 수 없음(외부 URI만 제공시)
-        uri = req.uri
-    else:
-        raise HTTPException(400, "json_text 또는 uri 중 하나는 필요")
+        return bytes(32), req.uri, None  # contentHash 알 수 없음(외부 URI만 제공시)
+    raise HTTPException(400, "json_text 또는 uri 중 하나는 필요")
 
-    # 트랜잭션
-    tx = CT.functions.create(rid, Web3.to_bytes(hexstr="0x"+ch_hex), uri).build_transaction({
-        "from": acct.address,
-        "nonce": w3.eth.get_transaction_count(acct.address),
-        "gas": 3_000_000,
-        "gasPrice": 0
-    })
-    signed = w3.eth.account.sign_transaction(tx, acct.key)
-    rc = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed.rawTransaction))
-    return {"txHash": rc.transactionHash.hex(), "recordId": Web3.to_hex(rid), "uri": uri}
-
-@app.put("/api/metadata/{recordIdHex}")
-def update(recordIdHex: str, req: UpdateReq):
+async def _estimate_gas(call, rids: List[bytes]) -> int:
+    """nonce 예약/파일 쓰기 전에 revert 여부 확인 + 가스 추정. 이미 존재하는 recordId면 409."""
     try:
-        rid = _b32(recordIdHex)
-    except Exception as e:
-        raise HTTPException(400, f"invalid recordId: {e}")
+        return await call.estimate_gas({"from": acct.address})
+    except ContractLogicError as e:
+        found = await asyncio.gather(*(_get_item(rid) for rid in rids))
+        exists = ["0x" + rid.hex() for rid, it in zip(rids, found) if it[3] != "0x0000000000000000000000000000000000000000"]
+        if exists:
+            raise HTTPException(409, f"recordId already exists: {', '.join(exists)}")
+        raise HTTPException(400, f"transaction reverted: {e}")
+
+def _require_success(rc):
+    # 추정 이후 상태가 바뀌면(동시 생성 등) 채굴 시점에 revert될 수 있음
+    if rc.status == 0:
+        raise HTTPException(409, f"transaction reverted on-chain: {rc.transactionHash.hex()}")
+
+@app.post("/api/metadata", dependencies=[Depends(_require_contract)], openapi_extra=CREATE_BODY)
+async def create(req: CreateReq = Depends(parse_create)):
+    rid = _resolve_rid(req)
+    ch, uri, target = _plan_v1(rid, req)
+    call = _CREATE_FN(rid, ch, uri)
+
+    # revert 확인(가스 추정)과 임시 파일 쓰기는 서로 독립이므로 동시에 진행하고,
+    # 둘 다 성공한 뒤에만 제자리로 옮겨 기존 객체를 덮어쓰지 않음. nonce는 그 다음에 예약
+    if target is None:
+        gas = await _estimate_gas(call, [rid])
+    else:
+        tmp = UPLOAD_DIR / f"{uuid.uuid4().hex}.part"
+        try:
+            gas, written = await asyncio.gather(
+                _estimate_gas(call, [rid]), _write_object(tmp, req.json_text), return_exceptions=True
+            )
+            for r in (gas, written):
+                if isinstance(r, BaseException):
+                    raise r
+            await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+            await asyncio.to_thread(os.replace, tmp, target)
+        finally:
+            await asyncio.to_thread(tmp.unlink, missing_ok=True)
+
+    # 트랜잭션 — nonce가 명시되고 chainId가 캐시되어 있어 빌드는 RPC 없이 끝남
+    rc = await _transact(call, gas)
+    _require_success(rc)
+    return {"txHash": rc.transactionHash.hex(), "recordId": "0x" + rid.hex(), "uri": uri}
+
+@app.post("/api/metadata/raw", dependencies=[Depends(_require_contract)])
+async def create_raw(req: Request, recordIdHex: Optional[str] = None):
+    # application/octet-stream 본문을 한 번만 흘려보내며 해시 + 저장 (str 변환/모델 생성 없음)
+    rid = parse_rid(recordIdHex) if recordIdHex else None
+    await asyncio.to_thread(UPLOAD_DIR.mkdir, parents=True, exist_ok=True)
+    tmp = UPLOAD_DIR / f"{uuid.uuid4().hex}.part"
+    try:
+        h, size = hashlib.sha256(), 0
+        async with aiofiles.open(tmp, "wb") as f:
+            async for chunk in req.stream():
+                h.update(chunk)
+                await f.write(chunk)
+                size += len(chunk)
+        if size == 0:
+            raise HTTPException(400, "empty body")
+        ch = h.digest()
+        # recordId 미지정 시 내용 기반 — 본문을 다시 읽지 않도록 digest에서 유도
+        if rid is None:
+            rid = keccak(ch)
+        rid_hex = rid.hex()
+        target = OBJECTS_DIR / rid_hex / "v1.json"
+        uri = f"{PUBLIC_BASE_URL}/objects/{rid_hex}/v1.json" if PUBLIC_BASE_URL else f"/objects/{rid_hex}/v1.json"
+        call = _CREATE_FN(rid, ch, uri)
+        # 제자리로 옮기기 전에 revert 확인 — 이미 존재하는 레코드면 409, 기존 객체를 덮어쓰지 않음
+        gas = await _estimate_gas(call, [rid])
+        await asyncio.to_thread(target.parent.mkdir, parents=True, exist_ok=True)
+        await asyncio.to_thread(os.replace, tmp, target)
+    finally:
+        await asyncio.to_thread(tmp.unlink, missing_ok=True)
+
+    rc = await _transact(call, gas)
+    _require_success(rc)
+    return {"txHash": rc.transactionHash.hex(), "recordId": "0x" + rid.hex(), "uri": uri}
+
+@app.post("/api/metadata/batch", dependencies=[Depends(_require_contract)], openapi_extra=CREATE_BATCH_BODY)
+async def create_batch(reqs: List[CreateReq] = Depends(parse_create_batch)):
+    # 여러 레코드를 createBatch 트랜잭션 1건으로 생성 (서명/전송/receipt 대기 1회)
+    if _CREATE_BATCH_FN is None:
+        raise HTTPException(501, "deployed contract has no createBatch — redeploy to enable")
+    if not reqs:
+        raise HTTPException(400, "empty batch")
+    if not all(r.json_text or r.uri for r in reqs):
+        raise HTTPException(400, "json_text 또는 uri 중 하나는 필요")
+    rids = [_resolve_rid(r, f"#{i}") for i, r in enumerate(reqs)]
+    if len(set(rids)) != len(rids):
+        raise HTTPException(400, "duplicate recordId in batch")
+    planned = [_plan_v1(rid, r) for rid, r in zip(rids, reqs)]
+    hashes = [ch for ch, _, _ in planned]
+    uris = [uri for _, uri, _ in planned]
+
+    call = _CREATE_BATCH_FN(rids, hashes, uris)
+
+    # 파일 쓰기/nonce 예약 전에 가스 추정 — 항목 수에 따라 가스가 달라지고,
+    # 이미 존재하는 recordId가 있으면 여기서 409로 끝나 기존 객체를 덮어쓰지 않음
+    gas = await _estimate_gas(call, rids)
+    await asyncio.gather(*(
+        _write_object(target, r.json_text) for (_, _, target), r in zip(planned, reqs) if target is not None
+    ))
+    rc = await _transact(call, gas)
+    _require_success(rc)
+    return {
+        "txHash": rc.transactionHash.hex(),
+        "items": [{"recordId": "0x" + rid.hex(), "uri": uri} for rid, uri in zip(rids, uris)],
+    }
 
+@app.put("/api/metadata/{recordIdHex}", dependencies=[Depends(_require_contract)], openapi_extra=UPDATE_BODY)
+async def update(recordIdHex: str, rid: RecordId, req: UpdateReq = Depends(parse_update)):
     # 기존 버전 조회
-    it = CT.functions.get(rid).call()
+    it = await _get_item(rid)
     if it[3] == "0x0000000000000000000000000000000000000000":
         raise HTTPException(404, "not found")
     current_ver = int(it[2])
@@ -229,24 +684,20 @@ def update(recordIdHex: str, req: UpdateReq):
     # 새 contentHash/URI
     if req.json_text:
         raw = req.json_text.encode()
-        ch_hex = _sha256_hex(raw)
-        rid_hex = recordIdHex[2:] if recordIdHex.startswith("0x") else recordIdHex
+        ch = _sha256(raw)
+        rid_hex = rid.hex()
         target = OBJECTS_DIR / rid_hex / f"v{current_ver+1}.json"
-        target.parent.mkdir(parents=True, exist_ok=True)
-        target.write_text(req.json_text)
+        await _write_object(target, req.json_text)
         uri = f"{PUBLIC_BASE_URL}/objects/{rid_hex}/v{current_ver+1}.json" if PUBLIC_BASE_URL else f"/objects/{rid_hex}/v{current_ver+1}.json"
     elif req.uri:
-        ch_hex = "0" * 64
+        ch = bytes(32)
         uri = req.uri
     else:
         raise HTTPException(400, "json_text 또는 uri 중 하나는 필요")
 
-    tx = CT.functions.update(rid, Web3.to_bytes(hexstr="0x"+ch_hex), uri).build_transaction({
-        "from": acct.address,
-        "nonce": w3.eth.get_transaction_count(acct.address),
-        "gas": 3_000_000,
-        "gasPrice": 0
-    })
-    signed = w3.eth.account.sign_transaction(tx, acct.key)
-    rc = w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed.rawTransaction))
-    return {"txHash": rc.transactionHash.hex(), "recordId": recordIdHex, "newUri": uri}
\ No newline at end of file
+    # 전송 전/채굴 후 모두 무효화 — 그 사이에 시작된 조회 결과도 캐시에 남지 않음
+    key = "0x" + rid.hex()
+    _invalidate_record(key)
+    rc = await _transact(_UPDATE_FN(rid, ch, uri))
+    _invalidate_record(key)
+    return {"txHash": rc.transactionHash.hex(), "recordId": key, "newUri": uri}
\ No newline at end of file
@@ -38,6 +38,25 @@ contract MetadataRegistry {
     );
 
     function create(bytes32 recordId, bytes32 contentHash, string calldata uri) external {
+        _create(recordId, contentHash, uri);
+    }
+
+    /// @notice 여러 레코드를 한 트랜잭션으로 생성 (서명·기본 가스를 1회만 지불)
+    /// @dev 인덱서가 항목별 contentHash/uri를 읽을 수 있도록 MetadataCreated는 항목마다 emit
+    function createBatch(
+        bytes32[] calldata recordIds,
+        bytes32[] calldata contentHashes,
+        string[] calldata uris
+    ) external {
+        uint256 n = recordIds.length;
+        require(contentHashes.length == n && uris.length == n, "length mismatch");
+        for (uint256 i; i < n; ) {
+            _create(recordIds[i], contentHashes[i], uris[i]);
+            unchecked { ++i; }
+        }
+    }
+
+    function _create(bytes32 recordId, bytes32 contentHash, string calldata uri) internal {
         require(items[recordId].owner == address(0), "exists");
         items[recordId] = Item({
             contentHash: contentHash,